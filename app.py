@@ -1,8 +1,12 @@
 import os
+import json
+import contextlib
 import time
 import logging
 import random
-from datetime import datetime
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import googleapiclient.discovery
 import yt_dlp
 from googleapiclient.discovery import build
@@ -25,7 +29,39 @@ TOKEN_FILE = "token.json"
 DOWNLOAD_DIR = "./downloads"
 OUTPUT_DIR = "./output"
 FFMPEG_PATH = "ffmpeg"  # Adjust if ffmpeg is not in PATH
+FFPROBE_PATH = "ffprobe"  # Adjust if ffprobe is not in PATH
 LOFI_AUDIO_FILE = "lofi.mp3"  # Make sure this file exists in your directory
+PROGRESS_LOG_INTERVAL = 5  # Seconds between ffmpeg progress log lines
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Bytes sent per resumable upload request
+MAX_UPLOAD_RETRIES = 5  # Retries per chunk on 5xx, 429 and connection errors
+TARGET_YEAR = 2025  # Only videos published in this year/month are compiled
+TARGET_MONTH = 7
+TARGET_MONTH_PREFIX = f"{TARGET_YEAR}-{TARGET_MONTH:02d}"  # publishedAt prefix, e.g. 2025-07
+DOWNLOAD_WORKERS = 4  # Number of videos downloaded in parallel
+PROBE_WORKERS = 8  # Number of ffprobe calls run in parallel
+X264_PRESET = os.environ.get('X264_PRESET', 'faster')  # libx264 speed/compression tradeoff
+X264_CRF = os.environ.get('X264_CRF', '20')  # libx264 quality (lower is better)
+VIDEO_ENCODER = os.environ.get('VIDEO_ENCODER')  # Force an encoder instead of auto-detecting
+
+# H.264 encoders in order of preference, with the quality settings used for each
+ENCODER_ARGS = {
+    'h264_nvenc': ['-c:v', 'h264_nvenc', '-preset', 'p5', '-rc', 'vbr', '-cq', '20', '-b:v', '0'],
+    'h264_qsv': ['-c:v', 'h264_qsv', '-preset', 'medium', '-global_quality', '20', '-look_ahead', '1'],
+    'h264_videotoolbox': ['-c:v', 'h264_videotoolbox', '-q:v', '65'],
+    'libx264': ['-c:v', 'libx264', '-preset', X264_PRESET, '-crf', X264_CRF],
+}
+_detected_encoder = None
+_youtube = None
+
+YDL_OPTS = {
+    'outtmpl': os.path.join(DOWNLOAD_DIR, 'video_%(id)s.mp4'),
+    'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+    'concurrent_fragment_downloads': 4,
+}
+# YoutubeDL isn't thread-safe, so each download thread reuses its own instance
+_ydl_local = threading.local()
+_ydl_instances = []
+_ydl_lock = threading.Lock()
 
 # Setup logging
 logging.basicConfig(
@@ -43,23 +79,142 @@ def cleanup_files():
     """Delete all downloaded and generated files"""
     try:
         # Delete downloaded files
-        for filename in os.listdir(DOWNLOAD_DIR):
-            file_path = os.path.join(DOWNLOAD_DIR, filename)
-            if os.path.isfile(file_path):
-                os.unlink(file_path)
+        with os.scandir(DOWNLOAD_DIR) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(entry.path)
 
         # Delete output files (keep the final uploaded versions)
-        for filename in os.listdir(OUTPUT_DIR):
-            if not filename.endswith('_uploaded.mp4'):
-                file_path = os.path.join(OUTPUT_DIR, filename)
-                if os.path.isfile(file_path):
-                    os.unlink(file_path)
+        with os.scandir(OUTPUT_DIR) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith('_uploaded.mp4'):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(entry.path)
 
         logger.info("Cleanup complete - deleted all temporary files")
     except Exception as e:
         logger.error(f"Error during cleanup: {e}")
 
 
+def detect_video_encoder():
+    """Return the first usable hardware H.264 encoder, falling back to libx264"""
+    global _detected_encoder
+    if _detected_encoder:
+        return _detected_encoder
+
+    if VIDEO_ENCODER in ENCODER_ARGS:
+        _detected_encoder = VIDEO_ENCODER
+        return _detected_encoder
+    if VIDEO_ENCODER:
+        logger.warning(f"Unknown VIDEO_ENCODER {VIDEO_ENCODER}, auto-detecting instead")
+
+    _detected_encoder = 'libx264'
+    try:
+        result = subprocess.run([FFMPEG_PATH, '-hide_banner', '-encoders'],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.warning(f"Could not list ffmpeg encoders, using libx264: {e}")
+        return _detected_encoder
+
+    for encoder, args in ENCODER_ARGS.items():
+        if encoder == 'libx264' or encoder not in result.stdout:
+            continue
+        # Being compiled in doesn't mean the hardware is present, so try a tiny encode
+        cmd = [
+            FFMPEG_PATH, '-hide_banner', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+            *args,
+            '-f', 'null', '-'
+        ]
+        if subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
+            _detected_encoder = encoder
+            break
+
+    return _detected_encoder
+
+
+def video_encoder_args():
+    """Return the ffmpeg video codec arguments for the detected encoder"""
+    return ENCODER_ARGS[detect_video_encoder()]
+
+
+def run_ffmpeg(cmd, description, duration=None):
+    """Run an ffmpeg command quietly, logging its -progress output every few seconds"""
+    cmd = [cmd[0], '-nostats', '-progress', 'pipe:1', '-loglevel', 'error', *cmd[1:]]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+
+    progress = {}
+    last_log = time.monotonic()
+    for line in process.stdout:
+        key, _, value = line.strip().partition('=')
+        progress[key] = value
+        # Each progress block ends with a progress=continue/end line
+        if key != 'progress' or time.monotonic() - last_log < PROGRESS_LOG_INTERVAL:
+            continue
+        last_log = time.monotonic()
+
+        try:
+            out_seconds = int(progress.get('out_time_us', '')) / 1_000_000
+        except ValueError:
+            continue
+        percent = f" ({out_seconds / duration * 100:.0f}%)" if duration else ""
+        logger.info(f"{description}: {out_seconds:.0f}s done{percent}, "
+                    f"{progress.get('fps', '?')} fps, speed {progress.get('speed', '?')}")
+
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+
+
+def probe(path):
+    """Return ffprobe metadata (stream types and sizes, container duration) as a dict"""
+    cmd = [
+        FFPROBE_PATH,
+        '-v', 'error',
+        '-show_entries', 'stream=codec_type,width,height:format=duration',
+        '-print_format', 'json',
+        path
+    ]
+    try:
+        return json.loads(subprocess.check_output(cmd, text=True))
+    except FileNotFoundError:
+        return probe_with_ffmpeg(path)
+
+
+def probe_with_ffmpeg(path):
+    """Fallback for probe() when ffprobe is unavailable, parsing a metadata-only ffmpeg run"""
+    cmd = [FFMPEG_PATH, '-hide_banner', '-i', path, '-t', '0', '-f', 'null', '-']
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+    duration = re.search(r'Duration: (\d+):(\d+):([\d.]+)', result.stderr)
+    if not duration:
+        raise ValueError(f"No duration found in ffmpeg output for {path}")
+    h, m, sec = duration.groups()
+    info = {'format': {'duration': str(int(h) * 3600 + int(m) * 60 + float(sec))}, 'streams': []}
+
+    resolution = re.search(r'Stream #.*Video:.*?(\d{2,5})x(\d{2,5})', result.stderr)
+    if resolution:
+        info['streams'].append({'codec_type': 'video',
+                                'width': int(resolution.group(1)), 'height': int(resolution.group(2))})
+    if re.search(r'Stream #.*Audio:', result.stderr):
+        info['streams'].append({'codec_type': 'audio'})
+    return info
+
+
+def probe_video_file(video_file):
+    """Return size, duration and audio presence of a video in DOWNLOAD_DIR"""
+    info = probe(os.path.join(DOWNLOAD_DIR, video_file))
+    video = next((stream for stream in info['streams'] if stream.get('codec_type') == 'video'), None)
+    if video is None:
+        raise ValueError(f"No video stream in {video_file}")
+    return {
+        'width': video['width'],
+        'height': video['height'],
+        'duration': float(info['format']['duration']),
+        'has_audio': any(stream.get('codec_type') == 'audio' for stream in info['streams']),
+    }
+
+
 def create_spedup_version(original_video_path):
     """Create a 4x speed version with random LOFI audio, matching video duration exactly"""
     if not os.path.exists(original_video_path):
@@ -72,61 +227,47 @@ def create_spedup_version(original_video_path):
 
     # Get duration of original video (after speedup)
     try:
-        # Get original video duration
-        cmd = [FFMPEG_PATH, '-i', original_video_path]
-        result = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
-        duration_line = [line for line in result.stderr.split('\n') if 'Duration:' in line][0]
-        original_duration = duration_line.split('Duration: ')[1].split(',')[0]
-        h, m, s = original_duration.split(':')
-        original_seconds = float(h) * 3600 + float(m) * 60 + float(s)
-        spedup_duration = original_seconds / 4  # 4x speed
-
-        # Get duration of LOFI audio
-        cmd = [FFMPEG_PATH, '-i', LOFI_AUDIO_FILE]
-        result = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
-        duration_line = [line for line in result.stderr.split('\n') if 'Duration:' in line][0]
-        lofi_duration = duration_line.split('Duration: ')[1].split(',')[0]
-        h, m, s = lofi_duration.split(':')
-        lofi_seconds = float(h) * 3600 + float(m) * 60 + float(s)
+        original_seconds = float(probe(original_video_path)['format']['duration'])
+        spedup_duration = original_seconds / 4.0  # 4x speed
+        lofi_seconds = float(probe(LOFI_AUDIO_FILE)['format']['duration'])
     except Exception as e:
         logger.error(f"Could not get durations: {e}")
         return None
 
-    # Calculate random start point ensuring audio is long enough
-    max_start = lofi_seconds - spedup_duration - 1  # 1 second buffer
-    if max_start <= 0:
-        logger.error("LOFI audio is too short for the sped-up video")
-        return None
-
-    random_start = random.uniform(0, max_start)
+    # Random start point; the audio is looped, so any point in the track works
+    random_start = random.uniform(0, lofi_seconds)
 
     # Create output filename
     base_name = os.path.splitext(os.path.basename(original_video_path))[0]
     output_path = os.path.join(OUTPUT_DIR, f"{base_name}_4x_lofi.mp4")
 
+    encoder_args = list(video_encoder_args())
+    if detect_video_encoder() == 'libx264':
+        encoder_args += ['-tune', 'fastdecode']
+
     # FFmpeg command to create 4x speed version with exactly matching duration
     cmd = [
         FFMPEG_PATH,
+        '-hwaccel', 'auto',
         '-i', original_video_path,
+        '-ss', str(random_start),
+        '-stream_loop', '-1',  # Loop LOFI audio for as long as the video needs
         '-i', LOFI_AUDIO_FILE,
-        '-filter_complex',
-        f'[0:v]setpts=0.15*PTS,trim=duration={spedup_duration}[v];'  # Force exact duration
-        f'[1:a]atrim=start={random_start},asetpts=PTS-STARTPTS,adelay=0|0,apad=whole_dur={spedup_duration}[a]',  # Pad audio to match
+        '-filter_complex', '[0:v]setpts=PTS/4[v]',
         '-map', '[v]',
-        '-map', '[a]',
-        '-shortest',  # Shouldn't be needed but kept as safety
-        '-c:v', 'libx264',
-        '-preset', 'slower',
-        '-crf', '18',
+        '-map', '1:a',
+        *encoder_args,
+        '-pix_fmt', 'yuv420p',
         '-c:a', 'aac',
         '-b:a', '192k',
-        '-t', str(spedup_duration),  # Explicit duration limit
+        '-t', str(spedup_duration),  # Single source of truth for the output length
+        '-movflags', '+faststart',
         output_path
     ]
 
     logger.info(f"Creating 4x speed version (duration: {spedup_duration:.2f}s) with LOFI audio...")
     try:
-        subprocess.run(cmd, check=True)
+        run_ffmpeg(cmd, "4x speed version", spedup_duration)
 
         return output_path
     except subprocess.CalledProcessError as e:
@@ -135,66 +276,92 @@ def create_spedup_version(original_video_path):
 
 def get_authenticated_service():
     """Authenticate and return the YouTube service, caching credentials"""
-    creds = None
+    global _youtube
+    if _youtube:
+        return _youtube
+
+    while True:
+        creds = None
+        if os.path.exists(TOKEN_FILE):
+            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
 
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+        if creds and creds.valid and set(creds.scopes or ()) >= set(SCOPES):
+            break
 
-    if not creds or not creds.valid or not creds.has_scopes(SCOPES):
         if creds and creds.expired and creds.refresh_token:
             try:
                 creds.refresh(Request())
             except RefreshError as e:
+                # Drop the stale token and go through the browser flow instead
                 logger.error(f"Failed to refresh token: {e}")
                 os.remove(TOKEN_FILE)
-                return get_authenticated_service()
+                continue
         else:
             flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
             creds = flow.run_local_server(port=0)
 
         with open(TOKEN_FILE, 'w') as token:
             token.write(creds.to_json())
+        break
 
-    return build(API_SERVICE_NAME, API_VERSION, credentials=creds)
+    _youtube = build(API_SERVICE_NAME, API_VERSION, credentials=creds, cache_discovery=False)
+    return _youtube
 
 def get_playlist_videos(youtube, playlist_id):
-    """Get all videos from a playlist including private/unlisted"""
+    """Get videos from the target month in a playlist including private/unlisted"""
     videos = []
     next_page_token = None
+    seen_in_range = False
 
     try:
         while True:
             request = youtube.playlistItems().list(
                 part="snippet,contentDetails",
                 playlistId=playlist_id,
-                maxResults=100,
+                maxResults=50,
                 pageToken=next_page_token
             )
             response = request.execute()
 
+            # Keep only videos from the target month so no status lookups are wasted
+            ids = []
+            meta = {}
+            past_target = False
             for item in response['items']:
-                video_id = item['contentDetails']['videoId']
-                published_at = item['snippet']['publishedAt']
-                title = item['snippet']['title']
-
-                # Get video details to check privacy status
-                video_request = youtube.videos().list(
+                # publishedAt is ISO 8601, so its YYYY-MM prefix compares lexicographically
+                published_month = item['snippet']['publishedAt'][:7]
+                if published_month == TARGET_MONTH_PREFIX:
+                    seen_in_range = True
+                    video_id = item['contentDetails']['videoId']
+                    ids.append(video_id)
+                    meta[video_id] = item['snippet']
+                elif seen_in_range and published_month > TARGET_MONTH_PREFIX:
+                    # Playlist items are chronological, nothing later can be in range
+                    past_target = True
+                    break
+
+            # Look up privacy status for up to 50 videos per request
+            privacy = {}
+            for i in range(0, len(ids), 50):
+                chunk = ids[i:i + 50]
+                video_response = youtube.videos().list(
                     part="status",
-                    id=video_id
-                )
-                video_response = video_request.execute()
+                    id=','.join(chunk)
+                ).execute()
+                for video_item in video_response['items']:
+                    privacy[video_item['id']] = video_item['status']['privacyStatus']
 
-                if video_response['items']:
-                    privacy_status = video_response['items'][0]['status']['privacyStatus']
+            for video_id in ids:
+                if video_id in privacy:
                     videos.append({
                         'id': video_id,
-                        'published_at': published_at,
-                        'title': title,
-                        'privacy_status': privacy_status
+                        'published_at': meta[video_id]['publishedAt'],
+                        'title': meta[video_id]['title'],
+                        'privacy_status': privacy[video_id]
                     })
 
             next_page_token = response.get('nextPageToken')
-            if not next_page_token:
+            if past_target or not next_page_token:
                 break
 
     except HttpError as e:
@@ -204,173 +371,118 @@ def get_playlist_videos(youtube, playlist_id):
 
     return videos
 
-def filter_august_2025_videos(videos):
-    """Filter videos published in August 2025"""
-    august_2025_videos = []
-
-    for video in videos:
-        try:
-            published_date = datetime.strptime(video['published_at'], '%Y-%m-%dT%H:%M:%SZ')
-            if published_date.year == 2025 and published_date.month == 7:
-                august_2025_videos.append(video)
-        except Exception as e:
-            logger.error(f"Error parsing date for video {video['id']}: {e}")
+def filter_target_month_videos(videos):
+    """Filter videos published in TARGET_YEAR/TARGET_MONTH"""
+    month_videos = [video for video in videos if video['published_at'].startswith(TARGET_MONTH_PREFIX)]
 
     # Sort by publication date
-    august_2025_videos.sort(key=lambda x: x['published_at'])
-
-    return august_2025_videos
-
-def download_video(video_id, filename):
-    """Download video using yt-dlp"""
+    month_videos.sort(key=lambda x: x['published_at'])
+
+    return month_videos
+
+def get_downloader():
+    """Return the calling thread's YoutubeDL instance, creating it on first use"""
+    ydl = getattr(_ydl_local, 'ydl', None)
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(YDL_OPTS)
+        _ydl_local.ydl = ydl
+        with _ydl_lock:
+            _ydl_instances.append(ydl)
+    return ydl
+
+def close_downloaders():
+    """Close every YoutubeDL instance created by get_downloader"""
+    with _ydl_lock:
+        for ydl in _ydl_instances:
+            ydl.close()
+        _ydl_instances.clear()
+
+def download_video(video_id):
+    """Download video using yt-dlp, returning its filename in DOWNLOAD_DIR or None"""
     url = f"https://www.youtube.com/watch?v={video_id}"
-    ydl_opts = {
-        'outtmpl': os.path.join(DOWNLOAD_DIR, filename),
-        'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-    }
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        return True
+        ydl = get_downloader()
+        info = ydl.extract_info(url)
+        return os.path.basename(ydl.prepare_filename(info))
     except Exception as e:
         logger.error(f"Download failed: {e}")
-        return False
+        return None
 
-def combine_videos(video_files, output_filename):
+def combine_videos(video_files, output_filename, probes=None):
     """Combine multiple videos into one using ffmpeg, upscaling to highest resolution"""
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
     output_path = os.path.join(OUTPUT_DIR, output_filename)
 
-    # First pass: Detect highest resolution (same as before)
-    max_width = 0
-    max_height = 0
-    for video_file in video_files:
-        try:
-            cmd = [
-                FFMPEG_PATH,
-                '-i', os.path.join(DOWNLOAD_DIR, video_file),
-                '-f', 'null', '-'
-            ]
-            result = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
-            stream_info = [line for line in result.stderr.split('\n') if 'Stream #0:0' in line and 'Video:' in line]
-            if stream_info:
-                parts = stream_info[0].split(',')
-                resolution_part = [p for p in parts if any(x in p for x in [' hd', ' sd', 'x', '0x0'])][0].strip()
-                resolution = resolution_part.split(' ')[0]
-
-                if 'x' in resolution:
-                    width, height = resolution.split('x')
-                    width = ''.join(filter(str.isdigit, width))
-                    height = ''.join(filter(str.isdigit, height.split(' ')[0]))
-
-                    if width and height:
-                        width = int(width)
-                        height = int(height)
-                        if width > max_width:
-                            max_width = width
-                            max_height = height
-        except Exception as e:
-            logger.error(f"Error detecting resolution for {video_file}: {e}")
-            continue
+    # First pass: Detect highest resolution, probing only files not already
+    # in probes (filename -> probe_video_file() result)
+    probes = dict(probes or {})
+    missing = [video_file for video_file in video_files if video_file not in probes]
+    with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as executor:
+        futures = {executor.submit(probe_video_file, video_file): video_file for video_file in missing}
+        for future in as_completed(futures):
+            try:
+                probes[futures[future]] = future.result()
+            except Exception as e:
+                logger.error(f"Error detecting resolution for {futures[future]}: {e}")
 
-    if max_width == 0 or max_height == 0:
-        max_width = 1280
-        max_height = 720
-        logger.warning(f"Using fallback resolution: {max_width}x{max_height}")
+    # A file that can't be probed would make the whole ffmpeg run fail
+    usable_files = []
+    for video_file in video_files:
+        if video_file in probes:
+            usable_files.append(video_file)
+        else:
+            logger.warning(f"Skipping {video_file}: it could not be probed")
 
-    logger.info(f"Upscaling all videos to: {max_width}x{max_height}")
+    if not usable_files:
+        logger.error("No videos could be probed, nothing to combine")
+        return None
 
-    # Create intermediate files with upscaling
-    intermediate_dir = os.path.join(OUTPUT_DIR, "intermediate")
-    os.makedirs(intermediate_dir, exist_ok=True)
-    intermediate_files = []
+    max_width, max_height = max(((probes[video_file]['width'], probes[video_file]['height'])
+                                 for video_file in usable_files),
+                                key=lambda wh: wh[0] * wh[1])
 
-    for idx, video_file in enumerate(video_files):
-        intermediate_path = os.path.join(intermediate_dir, f"int_{idx}.mp4")
-        cmd = [
-            FFMPEG_PATH,
-            '-i', os.path.join(DOWNLOAD_DIR, video_file),
-            '-vf', f'scale={max_width}:{max_height}:flags=lanczos',
-            '-c:v', 'libx264',
-            '-preset', 'slower',
-            '-crf', '18',
-            '-c:a', 'aac',
-            '-b:a', '192k',
-            '-movflags', '+faststart',
-            intermediate_path
-        ]
-        try:
-            logger.info(f"Upscaling {video_file}...")
-            subprocess.run(cmd, check=True)
-            intermediate_files.append(intermediate_path)
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to process {video_file}: {e}")
-            continue
+    logger.info(f"Upscaling all videos to: {max_width}x{max_height}")
 
-    if not intermediate_files:
-        logger.error("No valid intermediate files created")
-        return None
+    # Scale every input inside one filter graph and concatenate, so each
+    # frame is encoded exactly once
+    cmd = [FFMPEG_PATH]
+    for video_file in usable_files:
+        cmd += ['-hwaccel', 'auto', '-i', os.path.join(DOWNLOAD_DIR, video_file)]
+
+    filters = []
+    concat_inputs = ''
+    for idx, video_file in enumerate(usable_files):
+        filters.append(f'[{idx}:v]scale={max_width}:{max_height}:flags=lanczos,setsar=1[v{idx}]')
+        if probes[video_file]['has_audio']:
+            concat_inputs += f'[v{idx}][{idx}:a]'
+        else:
+            # concat needs an audio segment from every input, so pad with silence
+            duration = probes[video_file]['duration']
+            filters.append(f'anullsrc=r=48000:cl=stereo,atrim=duration={duration}[a{idx}]')
+            concat_inputs += f'[v{idx}][a{idx}]'
+    filters.append(f'{concat_inputs}concat=n={len(usable_files)}:v=1:a=1[v][a]')
+
+    cmd += [
+        '-filter_complex', ';'.join(filters),
+        '-map', '[v]',
+        '-map', '[a]',
+        *video_encoder_args(),
+        '-c:a', 'aac',
+        '-b:a', '192k',
+        '-movflags', '+faststart',
+        output_path
+    ]
 
-    # Concatenate the processed files
     try:
-        # Create concatenation list with absolute paths
-        list_path = os.path.join(intermediate_dir, "concat_list.txt")
-        with open(list_path, 'w') as f:
-            for file_path in intermediate_files:
-                # Write absolute paths to avoid any relative path confusion
-                abs_path = os.path.abspath(file_path)
-                f.write(f"file '{abs_path}'\n")
-
-        # Verify the list file was created correctly
-        if not os.path.exists(list_path):
-            raise FileNotFoundError(f"Concatenation list file not created: {list_path}")
-
-        # Verify the paths in the list file exist
-        with open(list_path, 'r') as f:
-            for line in f:
-                file_path = line.strip()[6:-1]  # Extract path from "file 'path'"
-                if not os.path.exists(file_path):
-                    raise FileNotFoundError(f"File in concat list does not exist: {file_path}")
-
-        cmd = [
-            FFMPEG_PATH,
-            '-f', 'concat',
-            '-safe', '0',
-            '-i', list_path,
-            '-c', 'copy',
-            output_path
-        ]
-        logger.info("Concatenating upscaled videos...")
-        subprocess.run(cmd, check=True)
+        logger.info(f"Upscaling and concatenating {len(usable_files)} videos...")
+        run_ffmpeg(cmd, "Compilation")
         return output_path
     except subprocess.CalledProcessError as e:
         logger.error(f"FFmpeg concatenation error: {e}")
-        # Debug: Print the contents of the concat list file
-        if os.path.exists(list_path):
-            with open(list_path, 'r') as f:
-                logger.error(f"Contents of concat_list.txt:\n{f.read()}")
-        return None
-    except Exception as e:
-        logger.error(f"Error during concatenation: {e}")
         return None
-    finally:
-        # Clean up intermediate files
-        for file_path in intermediate_files:
-            try:
-                os.unlink(file_path)
-            except OSError:
-                pass
-        try:
-            os.unlink(list_path)
-        except (OSError, NameError):
-            pass
-        try:
-            os.rmdir(intermediate_dir)
-        except OSError:
-            pass
 
 def upload_video(youtube, file_path, title, description, privacy="public"):
     """Upload video to YouTube"""
@@ -392,7 +504,7 @@ def upload_video(youtube, file_path, title, description, privacy="public"):
     }
 
     try:
-        media = MediaFileUpload(file_path, chunksize=-1, resumable=True)
+        media = MediaFileUpload(file_path, chunksize=UPLOAD_CHUNK_SIZE, resumable=True, mimetype='video/mp4')
         request = youtube.videos().insert(
             part=",".join(body.keys()),
             body=body,
@@ -400,7 +512,12 @@ def upload_video(youtube, file_path, title, description, privacy="public"):
         )
 
         logger.info(f"Uploading {file_path}...")
-        response = request.execute()
+        response = None
+        while response is None:
+            # next_chunk backs off and retries 5xx, 429 and connection errors itself
+            status, response = request.next_chunk(num_retries=MAX_UPLOAD_RETRIES)
+            if status:
+                logger.info(f"Upload {int(status.progress() * 100)}%")
         video_id = response.get('id')
 
         logger.info(f"Upload successful! Video ID: {video_id}")
@@ -416,6 +533,8 @@ def main():
     os.makedirs(DOWNLOAD_DIR, exist_ok=True)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+    logger.info(f"Using video encoder: {detect_video_encoder()}")
+
     # Get authenticated YouTube service
     youtube = get_authenticated_service()
     if not youtube:
@@ -435,22 +554,45 @@ def main():
         logger.error("No videos found in playlist or error fetching videos")
         return
 
-    # Filter for August 2025 videos
-    logger.info("Filtering for August 2025 videos...")
-    august_videos = filter_august_2025_videos(videos)
-    if not august_videos:
-        logger.error("No videos found published in August 2025")
+    # Filter for target month videos
+    logger.info(f"Filtering for videos published in {TARGET_MONTH_PREFIX}...")
+    month_videos = filter_target_month_videos(videos)
+    if not month_videos:
+        logger.error(f"No videos found published in {TARGET_MONTH_PREFIX}")
         return
 
-    logger.info(f"Found {len(august_videos)} videos from August 2025")
+    logger.info(f"Found {len(month_videos)} videos from {TARGET_MONTH_PREFIX}")
+
+    # Download videos in parallel. A playlist can list the same video more than
+    # once, so each id is downloaded a single time and reused at every position
+    downloaded = {}
+    probes = {}
+    try:
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            futures = {}
+            submitted = set()
+            for video in month_videos:
+                if video['id'] in submitted:
+                    continue
+                submitted.add(video['id'])
+                logger.info(f"Downloading {video['title']} ({video['id']})...")
+                futures[executor.submit(download_video, video['id'])] = video['id']
+
+            # Probe each video as soon as it lands, while other downloads continue
+            for future in as_completed(futures):
+                filename = future.result()
+                if filename:
+                    try:
+                        probes[filename] = probe_video_file(filename)
+                    except Exception as e:
+                        logger.error(f"Download of {filename} looks broken, skipping it: {e}")
+                        continue
+                    downloaded[futures[future]] = filename
+    finally:
+        close_downloaders()
 
-    # Download videos
-    downloaded_files = []
-    for idx, video in enumerate(august_videos):
-        filename = f"video_{idx}_{video['id']}.mp4"
-        logger.info(f"Downloading {video['title']} ({video['id']})...")
-        if download_video(video['id'], filename):
-            downloaded_files.append(filename)
+    # Keep playlist order for the compilation
+    downloaded_files = [downloaded[video['id']] for video in month_videos if video['id'] in downloaded]
 
     if not downloaded_files:
         logger.error("No videos were successfully downloaded")
@@ -459,7 +601,7 @@ def main():
     # Combine videos
     output_filename = "august_2025_compilation.mp4"
     logger.info("Combining videos...")
-    combined_path = combine_videos(downloaded_files, output_filename)
+    combined_path = combine_videos(downloaded_files, output_filename, probes)
     if not combined_path or not os.path.exists(combined_path):
         logger.error("Failed to combine videos")
         return